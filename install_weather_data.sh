@@ -155,7 +155,7 @@ sudo -u "$USER" bash -c "source $VENV_DIR/bin/activate && pip install --upgrade
 sudo -u "$USER" bash -c "source $VENV_DIR/bin/activate && pip install -r '$REQUIREMENTS_FILE'"
 
 # Альтернативная установка, если requirements.txt пустой или содержит только основные пакеты
-# sudo -u "$USER" bash -c "source $VENV_DIR/bin/activate && pip install openmeteo-requests requests-cache retry-requests pytz"
+# sudo -u "$USER" bash -c "source $VENV_DIR/bin/activate && pip install openmeteo-requests orjson requests requests-cache urllib3"
 
 # 7. Настройка прав доступа
 log_info "Настройка прав доступа..."
@@ -278,7 +278,6 @@ echo ""
 echo "Файлы:"
 echo "  Директория проекта:  $PROJECT_DIR"
 echo "  Логи приложения:     $PROJECT_DIR/weather-data.log"
-echo "  Кэш API:             $PROJECT_DIR/.cache/"
 echo "  Сервис systemd:      $SERVICE_FILE"
 echo "  Таймер systemd:      $TIMER_FILE"
 echo ""
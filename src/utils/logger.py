@@ -10,37 +10,53 @@ THIRD_PARTY_LOGGERS = [
     'requests_cache'
 ]
 
-# Словарь для преобразования числовых уровней в текстовые
-LOG_LEVEL_NAMES = {
-    logging.DEBUG: "DEBUG",
-    logging.INFO: "INFO", 
-    logging.WARNING: "WARNING",
-    logging.ERROR: "ERROR",
-    logging.CRITICAL: "CRITICAL",
-}
+# Общий форматтер для всех обработчиков
+_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    '%d.%m.%Y %H:%M:%S'
+)
+
+# Директории логов, уже созданные в этом процессе
+_ENSURED_DIRS: set[Path] = set()
+
+# Обработчики, установленные setup_logging, по имени логгера
+_INSTALLED_HANDLERS: dict[str, list[logging.Handler]] = {}
 
 def get_logger(name: str = 'test-name') -> logging.Logger:
     """Возвращает настроенный логгер"""
     return logging.getLogger(name)
 
-def get_log_level_name(log_level: str | int) -> str:
-    """Возвращает человеко-читаемое имя уровня логирования
+def _resolve_level(log_level: str | int) -> tuple[int, str]:
+    """Приводит уровень логирования к числу и человеко-читаемому имени
     
     Args:
         log_level: Уровень логирования (число или строка)
         
     Returns:
-        Строковое представление уровня логирования
+        Кортеж (числовой уровень, имя уровня). Неизвестная строка дает DEBUG.
     """
-    if isinstance(log_level, str):
-        # Если передана строка, проверяем есть ли такое имя
-        log_level_upper = log_level.upper()
-        if hasattr(logging, log_level_upper):
-            return log_level_upper
-        return log_level.upper()
-    else:
-        # Если передано число, ищем в словаре
-        return LOG_LEVEL_NAMES.get(log_level, f"UNKNOWN({log_level})")
+    if isinstance(log_level, int):
+        return log_level, logging.getLevelName(log_level)
+    log_level_upper = log_level.upper()
+    return getattr(logging, log_level_upper, logging.DEBUG), log_level_upper
+
+def _replace_handlers(logger: logging.Logger, handlers: list[logging.Handler]) -> None:
+    """Заменяет обработчики, ранее установленные setup_logging на этом логгере
+    
+    Чужие обработчики не трогаются. Прежние обработчики закрываются, только
+    если они больше не подключены ни к одному логгеру через setup_logging.
+    """
+    previous = _INSTALLED_HANDLERS.get(logger.name, [])
+    for handler in previous:
+        logger.removeHandler(handler)
+    for handler in handlers:
+        logger.addHandler(handler)
+    _INSTALLED_HANDLERS[logger.name] = list(handlers)
+    
+    in_use = {h for installed in _INSTALLED_HANDLERS.values() for h in installed}
+    for handler in previous:
+        if handler not in in_use:
+            handler.close()
 
 def setup_logging(
     log_file: Optional[str] = 'test_name.log',
@@ -62,17 +78,15 @@ def setup_logging(
     """
     logger = get_logger(logger_name)
     
-    # Очищаем существующие обработчики
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
     handlers = []
     
     # Добавляем файловый обработчик только если включено файловое логирование
     if enable_file_logging and log_file:
-        # Создаем директорию для логов, если ее нет
-        log_path = Path(log_file)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
+        # Создаем директорию для логов, если ее нет (один раз за процесс)
+        parent = Path(log_file).parent
+        if parent not in _ENSURED_DIRS:
+            parent.mkdir(parents=True, exist_ok=True)
+            _ENSURED_DIRS.add(parent)
         handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
     
     if console:
@@ -81,29 +95,29 @@ def setup_logging(
     if not handlers:
         handlers.append(logging.NullHandler())
     
-    # Преобразуем строковый уровень в числовой, если нужно
-    if isinstance(log_level, str):
-        log_level_value = getattr(logging, log_level.upper(), logging.DEBUG)
-    else:
-        log_level_value = log_level
+    # Преобразуем уровень в числовой и получаем его имя
+    log_level_value, log_level_name = _resolve_level(log_level)
     
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%d.%m.%Y %H:%M:%S',
-        level=log_level_value,
-        handlers=handlers
-    )
+    for handler in handlers:
+        handler.setFormatter(_FORMATTER)
     
-    # Настройка логгеров сторонних библиотек
-    if suppress_third_party:
-        for lib_name in THIRD_PARTY_LOGGERS:
-            lib_logger = logging.getLogger(lib_name)
-            lib_logger.setLevel(logging.WARNING)  # Показывать только WARNING и выше
-            lib_logger.propagate = True  # Позволяет родительским логгерам обрабатывать сообщения
+    # Обработчики подключаются к именованному логгеру, корневой не трогаем,
+    # поэтому повторный вызов заменяет прежнюю настройку, а не дублирует ее
+    _replace_handlers(logger, handlers)
+    logger.setLevel(log_level_value)
+    logger.propagate = False
     
-    # Получаем человеко-читаемое имя уровня логирования
-    log_level_name = get_log_level_name(log_level)
+    # Настройка логгеров сторонних библиотек: корневой логгер без обработчиков,
+    # поэтому они пишут в те же обработчики, что и основной логгер
+    for lib_name in THIRD_PARTY_LOGGERS:
+        lib_logger = logging.getLogger(lib_name)
+        if suppress_third_party:
+            lib_logger.setLevel(logging.WARNING)  # Показывать только WARNING и выше
+        else:
+            lib_logger.setLevel(log_level_value)  # Показывать на общем уровне
+        _replace_handlers(lib_logger, handlers)
+        lib_logger.propagate = False
     
     logger.debug("Логирование инициализировано")
-    logger.debug(f"Уровень логирования: {log_level_name}")
-    logger.debug(f"Файловое логирование: {'включено' if enable_file_logging else 'отключено'}")
\ No newline at end of file
+    logger.debug("Уровень логирования: %s", log_level_name)
+    logger.debug("Файловое логирование: %s", 'включено' if enable_file_logging else 'отключено')
\ No newline at end of file
@@ -1,191 +1,306 @@
 from time import time
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import takewhile
+from pathlib import Path
+import logging
+import random
+from typing import Final
 from utils.logger import get_logger, setup_logging
 import openmeteo_requests
+import orjson
+import requests
 import requests_cache
-from retry_requests import retry
-import pytz
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from zoneinfo import ZoneInfo
 
 logger = get_logger('Weather-data')
 
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Текущие показатели погоды в порядке, в котором их возвращает API
+CURRENT_VARIABLES = [
+    "temperature_2m", "relative_humidity_2m", "apparent_temperature",
+    "precipitation", "rain", "showers", "snowfall", "weather_code",
+    "cloud_cover", "pressure_msl", "surface_pressure", "wind_speed_10m",
+    "wind_direction_10m", "wind_gusts_10m"
+]
+
+# Неизменная часть параметров запроса (собирается один раз при импорте)
+_BASE_PARAMS: Final[dict[str, str | int]] = {
+    "current": ",".join(CURRENT_VARIABLES),
+    "timezone": "auto",
+    "past_days": 0
+}
+
+# Координаты для сбора данных (пример: Белгород, Россия)
+LOCATIONS = [
+    (50.36, 36.36),
+]
+
+# Размер пула keep-alive соединений (запросы идут к одному хосту API)
+HTTP_POOL_CONNECTIONS = 2
+HTTP_POOL_MAXSIZE = 8
+
+# Параметры повторных попыток: экспоненциальная задержка со случайным разбросом
+RETRY_TOTAL = 5
+RETRY_BACKOFF_BASE = 0.02  # секунды
+RETRY_BACKOFF_MAX = 10  # секунды
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# Преобразование кода погоды (WMO) в текстовое описание
+_WEATHER_CODES: Final[dict[int, str]] = {
+    0: "☀️ Ясно",
+    1: "🌤️ Преимущественно ясно", 
+    2: "⛅ Переменная облачность",
+    3: "☁️ Пасмурно",
+    45: "🌫️ Туман",
+    48: "🌫️ Изморозь",
+    51: "🌧️ Морось слабая",
+    53: "🌧️ Морось умеренная",
+    55: "🌧️ Морось сильная",
+    56: "🌧️❄️ Ледяная морось слабая",
+    57: "🌧️❄️ Ледяная морось сильная",
+    61: "🌧️ Дождь слабый",
+    63: "🌧️ Дождь умеренный",
+    65: "🌧️ Дождь сильный",
+    66: "🌧️🧊 Ледяной дождь слабый",
+    67: "🌧️🧊 Ледяной дождь сильный",
+    71: "🌨️ Снег слабый",
+    73: "🌨️ Снег умеренный",
+    75: "🌨️ Снег сильный",
+    77: "❄️ Снежные зерна",
+    80: "🌦️ Ливень слабый",
+    81: "🌦️ Ливень умеренный",
+    82: "⛈️ Ливень сильный",
+    85: "🌨️ Снегопад слабый",
+    86: "🌨️ Снегопад сильный",
+    95: "⛈️ Гроза",
+    96: "⛈️ Гроза с градом слабая",
+    99: "⛈️ Гроза с градом сильная"
+}
+
+# Таблица описаний, индексируемая кодом погоды (коды WMO лежат в диапазоне 0..99)
+_WEATHER_CODE_TABLE: Final[tuple[str | None, ...]] = tuple(
+    _WEATHER_CODES.get(code) for code in range(100)
+)
+
+# Часовые пояса (создаются один раз при импорте)
+_UTC = timezone.utc
+_MSK = ZoneInfo('Europe/Moscow')
+
+# Клиент Open-Meteo, общий для всех запросов процесса (создается лениво)
+_CLIENT = None
+
+class JitteredRetry(Retry):
+    """Retry с задержкой "full jitter": random.uniform(0, min(max, base * 2**(n-1)))
+
+    n - число подряд идущих ошибок; при n = 0 задержки нет.
+
+    В отличие от детерминированного backoff_factor, клиенты не повторяют
+    запросы синхронно при массовых ошибках 429/5xx.
+    """
+
+    def get_backoff_time(self):
+        # Считаем подряд идущие ошибки так же, как базовый Retry (без редиректов)
+        consecutive_errors = len(list(takewhile(
+            lambda x: x.redirect_location is None, reversed(self.history)
+        )))
+        if consecutive_errors == 0:
+            return 0
+        return random.uniform(
+            0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (consecutive_errors - 1))
+        )
+
 # Настройка клиента Open-Meteo с кэшированием и повторными попытками
 def setup_openmeteo_client(cache_expire_seconds=300):
     """
     Настраивает клиент Open-Meteo с кэшированием и повторными попытками
     
+    Клиент создается один раз на процесс, повторные вызовы возвращают его же,
+    чтобы переиспользовать пул соединений и открытый кэш.
+    
     Args:
-        cache_expire_seconds: Время жизни кэша в секундах (по умолчанию 5 минут)
+        cache_expire_seconds: Время жизни кэша в секундах (по умолчанию 5 минут).
+            Учитывается только при первом вызове.
     
     Returns:
         Настроенный клиент Open-Meteo
     """
-    # Настройка кэширования сессии
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    
+    # Настройка кэширования сессии (в памяти процесса: при коротком TTL
+    # обращения к SQLite дороже самого кэша)
     cache_session = requests_cache.CachedSession(
         '.cache', 
-        expire_after=cache_expire_seconds
+        backend='memory',
+        expire_after=cache_expire_seconds,
+        allowable_methods=('GET',),
+        match_headers=False
     )
     
-    # Настройка повторных попыток
-    retry_session = retry(
-        cache_session, 
-        retries=3, 
-        backoff_factor=0.5
-    )
+    # Настройка пула соединений и повторных попыток
+    cache_session.mount('https://', HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=False,
+        max_retries=JitteredRetry(
+            total=RETRY_TOTAL,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=['GET']
+        )
+    ))
     
     # Создание клиента Open-Meteo
-    return openmeteo_requests.Client(session=retry_session)
+    _CLIENT = openmeteo_requests.Client(session=cache_session)
+    return _CLIENT
 
-# Функция для конвертации времени из UTC в МСК с использованием pytz
-def convert_utc_to_msk_pytz(utc_datetime_str):
+# Функция для форматирования unix-времени в МСК (время наблюдения совпадает
+# у разных координат и между опросами, поэтому результат кэшируется)
+@lru_cache(maxsize=256)
+def _format_msk(unix_ts):
     """
-    Конвертирует строку времени из UTC в МСК с использованием pytz
+    Форматирует unix-время как время в МСК
     
     Args:
-        utc_datetime_str: Строка времени в формате ISO (YYYY-MM-DDTHH:MM:SS+00:00)
+        unix_ts: Время в секундах с начала эпохи (UTC)
     
     Returns:
         Строка времени в МСК в формате YYYY-MM-DD HH:MM:SS
     """
-    try:
-        # Определяем часовые пояса
-        utc_tz = pytz.UTC
-        msk_tz = pytz.timezone('Europe/Moscow')
-        
-        # Парсим строку UTC
-        if '+' in utc_datetime_str or 'Z' in utc_datetime_str:
-            # Если есть информация о часовом поясе
-            naive_dt = datetime.fromisoformat(utc_datetime_str.replace('Z', '+00:00'))
-            utc_dt = naive_dt.astimezone(utc_tz) if naive_dt.tzinfo is None else naive_dt
-        else:
-            # Если нет информации о часовом поясе, считаем что это UTC
-            naive_dt = datetime.fromisoformat(utc_datetime_str)
-            utc_dt = utc_tz.localize(naive_dt)
-        
-        # Конвертируем в МСК
-        msk_dt = utc_dt.astimezone(msk_tz)
-        
-        # Форматируем для удобного отображения
-        return msk_dt.strftime('%Y-%m-%d %H:%M:%S')
-    except Exception as e:
-        logger.error(f"Ошибка конвертации времени с pytz: {str(e)}")
-        return utc_datetime_str
+    return datetime.fromtimestamp(unix_ts, _MSK).strftime('%Y-%m-%d %H:%M:%S')
 
 # Альтернативная функция с простым подходом
 def get_current_msk_time():
     """Получает текущее время в МСК"""
-    msk_tz = pytz.timezone('Europe/Moscow')
-    msk_time = datetime.now(msk_tz)
-    return msk_time.strftime('%Y-%m-%d %H:%M:%S')
+    return datetime.now(_MSK).strftime('%Y-%m-%d %H:%M:%S')
+
+# Функция логирования ошибки запроса к API
+def _log_request_error(error):
+    """
+    Логирует ошибку запроса к Open-Meteo
+    
+    Сетевые ошибки и ошибки, о которых сообщил API (400/429), логируются одной
+    строкой без трассировки; остальные - с полной трассировкой.
+    
+    Args:
+        error: Исключение, полученное от client.weather_api
+    """
+    # Исходная причина, если клиент обернул исключение
+    cause = error.__cause__ or error
+    
+    if isinstance(cause, requests.Timeout):
+        logger.warning("Таймаут запроса к Open-Meteo после повторных попыток")
+    elif isinstance(cause, requests.HTTPError):
+        logger.warning("Open-Meteo вернул HTTP %s", getattr(cause.response, 'status_code', None))
+    elif isinstance(cause, requests.RequestException):
+        logger.warning("Ошибка сети при запросе к Open-Meteo: %s", cause)
+    elif isinstance(cause, openmeteo_requests.OpenMeteoRequestsError):
+        logger.warning("Open-Meteo вернул ошибку: %s", cause)
+    else:
+        logger.error("Ошибка при получении данных погоды: %s", error, exc_info=error)
 
 # Функция запроса погоды
-def get_weather_data(client, latitude, longitude, forecast_days=7):
+def get_weather_data(client, latitudes, longitudes):
     """
-    Получает данные погоды для указанных координат
+    Получает данные погоды для списка координат одним запросом к API
     
     Args:
         client: Клиент Open-Meteo
-        latitude: Широта
-        longitude: Долгота
-        forecast_days: Количество дней прогноза (макс. 16)
+        latitudes: Список широт
+        longitudes: Список долгот (в том же порядке, что и широты)
     
     Returns:
-        Словарь с данными погоды или None в случае ошибки
+        Список словарей с данными погоды в порядке координат;
+        None на месте координат, для которых данные не получены
     """
-    url = "https://api.open-meteo.com/v1/forecast"
+    url = OPEN_METEO_URL
+    results = [None] * len(latitudes)
     
-    # Параметры запроса
+    # Параметры запроса (несколько координат передаются через запятую)
     params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "current": [
-            "temperature_2m", "relative_humidity_2m", "apparent_temperature",
-            "precipitation", "rain", "showers", "snowfall", "weather_code",
-            "cloud_cover", "pressure_msl", "surface_pressure", "wind_speed_10m",
-            "wind_direction_10m", "wind_gusts_10m"
-        ],
-        "hourly": [
-            "temperature_2m", "relative_humidity_2m", "precipitation",
-            "weather_code", "surface_pressure", "wind_speed_10m"
-        ],
-        "daily": [
-            "weather_code", "temperature_2m_max", "temperature_2m_min",
-            "apparent_temperature_max", "apparent_temperature_min",
-            "precipitation_sum", "precipitation_hours", "wind_speed_10m_max"
-        ],
-        "timezone": "auto",
-        "forecast_days": forecast_days,
-        "past_days": 0
+        **_BASE_PARAMS,
+        "latitude": ",".join(map(str, latitudes)),
+        "longitude": ",".join(map(str, longitudes))
     }
     
     try:
-        logger.info(f"Запрос погоды для координат: {latitude}, {longitude}")
+        logger.info("Запрос погоды для координат: %s; %s", params["latitude"], params["longitude"])
         
-        # Выполнение запроса
+        # Выполнение запроса (API возвращает по ответу на каждую пару координат)
         responses = client.weather_api(url, params=params)
         
         if not responses:
             logger.error("Получен пустой ответ от API")
-            return None
+            return results
         
-        response = responses[0]
+        # Время получения данных: один снимок часов для UTC и МСК
+        now_utc = datetime.now(_UTC)
+        timestamp_utc = now_utc.isoformat()
+        timestamp_msk = now_utc.astimezone(_MSK).strftime('%Y-%m-%d %H:%M:%S')
         
-        # Извлечение данных
-        current = response.Current()
-        hourly = response.Hourly()
-        daily = response.Daily()
-        
-        # Получаем время в UTC
-        utc_time = datetime.fromtimestamp(current.Time(), timezone.utc)
-        utc_time_str = utc_time.isoformat()
-        
-        # Конвертируем в МСК с использованием pytz
-        msk_time_str = convert_utc_to_msk_pytz(utc_time_str)
-        
-        # Получаем текущее время выполнения скрипта в МСК
-        current_msk_time = get_current_msk_time()
-        
-        # Формирование результата
-        weather_data = {
-            "timestamp": current_msk_time,  # Время получения данных в МСК
-            "timestamp_utc": datetime.now(timezone.utc).isoformat(),  # Для справки
-            "coordinates": {
-                "latitude": latitude,
-                "longitude": longitude,
-                "elevation": response.Elevation()
-            },
-            "current": {
-                "time_utc": utc_time_str,
-                "time_msk": msk_time_str,  # Время наблюдения в МСК
-                "temperature": round(current.Variables(0).Value(), 1),
-                "humidity": round(current.Variables(1).Value()),
-                "apparent_temperature": round(current.Variables(2).Value(), 1),
-                "precipitation": round(current.Variables(3).Value(), 1),
-                "rain": round(current.Variables(4).Value(), 1),
-                "showers": round(current.Variables(5).Value(), 1),
-                "snowfall": round(current.Variables(6).Value(), 1),
-                "weather_code": int(current.Variables(7).Value()),
-                "cloud_cover": round(current.Variables(8).Value()),
-                "pressure_msl": round(current.Variables(9).Value()),
-                "surface_pressure": round(current.Variables(10).Value()),
-                "wind_speed": round(current.Variables(11).Value(), 1),
-                "wind_direction": round(current.Variables(12).Value()),
-                "wind_gusts": round(current.Variables(13).Value(), 1)
-            },
-            "forecast_days": forecast_days,
-            "units": {
-                "temperature": "°C",
-                "precipitation": "mm",
-                "pressure": "hPa",
-                "wind_speed": "km/h"
+        for i, response in enumerate(responses[:len(results)]):
+            # Извлечение данных
+            current = response.Current()
+            # Читаем все текущие показатели за один проход (порядок как в CURRENT_VARIABLES)
+            variables = current.Variables
+            (temperature, humidity, apparent_temperature, precipitation, rain, showers,
+             snowfall, weather_code, cloud_cover, pressure_msl, surface_pressure,
+             wind_speed, wind_direction, wind_gusts) = [
+                variables(j).Value() for j in range(current.VariablesLength())
+            ]
+            
+            # Время наблюдения (unix, UTC)
+            observed_ts = current.Time()
+            
+            # Формирование результата
+            results[i] = {
+                "timestamp": timestamp_msk,  # Время получения данных в МСК
+                "timestamp_utc": timestamp_utc,  # Для справки
+                "coordinates": {
+                    "latitude": latitudes[i],
+                    "longitude": longitudes[i],
+                    "elevation": response.Elevation()
+                },
+                "current": {
+                    "time_utc": datetime.fromtimestamp(observed_ts, _UTC).isoformat(),
+                    "time_msk": _format_msk(observed_ts),  # Время наблюдения в МСК
+                    "temperature": round(temperature, 1),
+                    "humidity": round(humidity),
+                    "apparent_temperature": round(apparent_temperature, 1),
+                    "precipitation": round(precipitation, 1),
+                    "rain": round(rain, 1),
+                    "showers": round(showers, 1),
+                    "snowfall": round(snowfall, 1),
+                    "weather_code": int(weather_code),
+                    "cloud_cover": round(cloud_cover),
+                    "pressure_msl": round(pressure_msl),
+                    "surface_pressure": round(surface_pressure),
+                    "wind_speed": round(wind_speed, 1),
+                    "wind_direction": round(wind_direction),
+                    "wind_gusts": round(wind_gusts, 1)
+                },
+                "units": {
+                    "temperature": "°C",
+                    "precipitation": "mm",
+                    "pressure": "hPa",
+                    "wind_speed": "km/h"
+                }
             }
-        }
         
-        logger.info(f"Данные погоды успешно получены.")
-        return weather_data
+        logger.info("Данные погоды успешно получены.")
+        return results
         
+    # Клиент оборачивает ошибки запроса в OpenMeteoRequestsError
+    except (openmeteo_requests.OpenMeteoRequestsError, requests.RequestException) as e:
+        _log_request_error(e)
+        return results
     except Exception as e:
-        logger.error(f"Ошибка при получении данных погоды: {str(e)}", exc_info=True)
-        return None
+        logger.error("Ошибка при получении данных погоды: %s", e, exc_info=True)
+        return results
 
 # Функция для логирования сводной информации о погоде
 def log_weather_summary(weather_data):
@@ -193,54 +308,38 @@ def log_weather_summary(weather_data):
     if not weather_data:
         return
     
+    # Не формируем строки сводки, если уровень INFO отключен
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     current = weather_data['current']
     
     # Преобразование кода погоды в текстовое описание
-    weather_codes = {
-        0: "☀️ Ясно",
-        1: "🌤️ Преимущественно ясно", 
-        2: "⛅ Переменная облачность",
-        3: "☁️ Пасмурно",
-        45: "🌫️ Туман",
-        48: "🌫️ Изморозь",
-        51: "🌧️ Морось слабая",
-        53: "🌧️ Морось умеренная",
-        55: "🌧️ Морось сильная",
-        56: "🌧️❄️ Ледяная морось слабая",
-        57: "🌧️❄️ Ледяная морось сильная",
-        61: "🌧️ Дождь слабый",
-        63: "🌧️ Дождь умеренный",
-        65: "🌧️ Дождь сильный",
-        66: "🌧️🧊 Ледяной дождь слабый",
-        67: "🌧️🧊 Ледяной дождь сильный",
-        71: "🌨️ Снег слабый",
-        73: "🌨️ Снег умеренный",
-        75: "🌨️ Снег сильный",
-        77: "❄️ Снежные зерна",
-        80: "🌦️ Ливень слабый",
-        81: "🌦️ Ливень умеренный",
-        82: "⛈️ Ливень сильный",
-        85: "🌨️ Снегопад слабый",
-        86: "🌨️ Снегопад сильный",
-        95: "⛈️ Гроза",
-        96: "⛈️ Гроза с градом слабая",
-        99: "⛈️ Гроза с градом сильная"
-    }
-    
-    weather_description = weather_codes.get(
-        current['weather_code'], 
-        f"Код погоды: {current['weather_code']}"
-    )
+    code = current['weather_code']
+    weather_description = (
+        _WEATHER_CODE_TABLE[code] if 0 <= code < 100 else None
+    ) or f"Код погоды: {code}"
 
     logger.info("СВОДКА ПОГОДЫ")
-    logger.info(f"Время наблюдения (МСК): {current['time_msk']}")
-    logger.info(f"Время запроса (МСК):    {weather_data['timestamp']}")
-    logger.info(f"Температура:            {current['temperature']}°C (ощущается как {current['apparent_temperature']}°C)")
-    logger.info(f"Влажность:              {current['humidity']}%")
-    logger.info(f"Погода:                 {weather_description}")
-    logger.info(f"Ветер:                  {current['wind_speed']} км/ч, порывы до {current['wind_gusts']} км/ч")
-    logger.info(f"Давление:               {current['surface_pressure']} hPa")
-    logger.info(f"Осадки:                 {current['precipitation']} мм/ч")
+    logger.info("Время наблюдения (МСК): %s", current['time_msk'])
+    logger.info("Время запроса (МСК):    %s", weather_data['timestamp'])
+    logger.info("Температура:            %s°C (ощущается как %s°C)", current['temperature'], current['apparent_temperature'])
+    logger.info("Влажность:              %s%%", current['humidity'])
+    logger.info("Погода:                 %s", weather_description)
+    logger.info("Ветер:                  %s км/ч, порывы до %s км/ч", current['wind_speed'], current['wind_gusts'])
+    logger.info("Давление:               %s hPa", current['surface_pressure'])
+    logger.info("Осадки:                 %s мм/ч", current['precipitation'])
+
+# Функция сохранения данных погоды в JSON
+def save_to_json(data, path):
+    """
+    Сохраняет данные погоды в JSON-файл
+    
+    Args:
+        data: Словарь (или список словарей) с данными погоды
+        path: Путь к файлу
+    """
+    Path(path).write_bytes(orjson.dumps(data, option=orjson.OPT_NAIVE_UTC))
 
 def main():
     # Настройка логирования
@@ -248,47 +347,48 @@ def main():
         log_file='weather-data.log',
         log_level=20,  # INFO
         console=True, 
+        logger_name=logger.name,
         suppress_third_party=True,
         enable_file_logging=True
     )
     
-    # Координаты (пример: Белгород, Россия)
-    latitude = 50.36
-    longitude = 36.36
-    
     # Настройка клиента Open-Meteo
     try:
         client = setup_openmeteo_client(cache_expire_seconds=300)
         logger.debug("Клиент Open-Meteo успешно настроен")
     except Exception as e:
-        logger.error(f"Ошибка настройки клиента Open-Meteo: {str(e)}")
+        logger.error("Ошибка настройки клиента Open-Meteo: %s", e)
         return
     
-    # Получение данных погоды
-    weather_data = get_weather_data(
+    # Получение данных погоды для всех координат одним запросом
+    latitudes, longitudes = zip(*LOCATIONS)
+    results = get_weather_data(
         client=client,
-        latitude=latitude,
-        longitude=longitude,
-        forecast_days=3  # Получаем прогноз на 3 дня
+        latitudes=latitudes,
+        longitudes=longitudes
     )
     
     # Логирование результата
-    if weather_data:
-        log_weather_summary(weather_data)
-        
-        # Дополнительная информация для отладки
-        logger.debug(f"Полные данные: {weather_data}")
+    for (latitude, longitude), weather_data in zip(LOCATIONS, results):
+        if weather_data:
+            log_weather_summary(weather_data)
+            
+            # Дополнительная информация для отладки
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Полные данные: %s",
+                    orjson.dumps(weather_data, option=orjson.OPT_INDENT_2).decode()
+                )
 
-    else:
-        logger.warning("Не удалось получить данные погоды")
+        else:
+            logger.warning("Не удалось получить данные погоды для %s, %s", latitude, longitude)
 
 if __name__ == '__main__':
     start_time = time()  # Время начала запуска скрипта
-    logger.info(f"Скрипт запущен в {get_current_msk_time()} (МСК)")
+    logger.info("Скрипт запущен в %s (МСК)", get_current_msk_time())
     main()
     
     # Получаем время окончания в МСК
-    msk_tz = pytz.timezone('Europe/Moscow')
-    end_time_msk = datetime.now(msk_tz).strftime('%Y-%m-%d %H:%M:%S')
+    end_time_msk = get_current_msk_time()
     
-    logger.info(f'Скрипт выполнен в {end_time_msk} (МСК) за {(time() - start_time):.2f} секунд \n{'=' * 110}')
\ No newline at end of file
+    logger.info('Скрипт выполнен в %s (МСК) за %.2f секунд \n%s', end_time_msk, time() - start_time, '=' * 110)
\ No newline at end of file